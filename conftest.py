@@ -0,0 +1,20 @@
+"""Shared pytest configuration for the test/ and tests/ suites."""
+
+import os
+
+import pytest
+
+# Test modules import the Lambdas at module level, and those build boto3
+# clients at import time, so the region has to be in place before collection.
+_ENV_DEFAULTS = {"AWS_DEFAULT_REGION": "us-east-1"}
+_env_patch = pytest.MonkeyPatch()
+
+
+def pytest_configure(config):
+    for name, value in _ENV_DEFAULTS.items():
+        if name not in os.environ:
+            _env_patch.setenv(name, value)
+
+
+def pytest_unconfigure(config):
+    _env_patch.undo()
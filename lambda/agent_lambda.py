@@ -5,11 +5,11 @@ from __future__ import annotations
 import json
 import logging
 import os
+import random
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
-from functools import lru_cache
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
 import boto3
 import numpy as np
@@ -26,6 +26,9 @@ DEFAULT_EFFECTIVE_DATE = os.getenv("MSA_DEFAULT_EFFECTIVE_DATE", "2024-01-01")
 DEFAULT_VENDOR_NAME = os.getenv("MSA_VENDOR_NAME", "SERVPRO").upper()
 VARIANCE_THRESHOLD = float(os.getenv("MSA_VARIANCE_THRESHOLD", "1.05"))
 OVERTIME_THRESHOLD = float(os.getenv("MSA_OVERTIME_THRESHOLD", "40.0"))
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_ATTEMPTS = 3
+BATCH_GET_BASE_DELAY_SECONDS = 0.05
 
 
 def _rate_key(vendor: str, labor_type: str, location: str) -> Dict[str, str]:
@@ -35,34 +38,94 @@ def _rate_key(vendor: str, labor_type: str, location: str) -> Dict[str, str]:
     }
 
 
+def _normalize_vendor(vendor: str | None) -> str:
+    return (vendor or DEFAULT_VENDOR_NAME).strip().upper() or DEFAULT_VENDOR_NAME
+
+
+def _candidate_rate_keys(vendor: str, labor_code: str, location: str) -> List[Dict[str, str]]:
+    """Keys to try for a rate, most specific first."""
+    locations: List[str] = [location] if location and location != "default" else []
+    locations.append("default")
+
+    rate_keys: List[Dict[str, str]] = [_rate_key(vendor, labor_code, loc) for loc in locations]
+    rate_keys.extend(
+        [
+            {
+                "rate_id": f"{vendor}#{labor_code}_default",
+                "effective_date": DEFAULT_EFFECTIVE_DATE,
+            },
+            {
+                "rate_id": f"{vendor}#{labor_code}",
+                "effective_date": DEFAULT_EFFECTIVE_DATE,
+            },
+        ]
+    )
+    return rate_keys
+
+
 class MSARatesManager:
     """Fetch vendor-aware MSA rates from DynamoDB."""
 
     def __init__(self) -> None:
         self.table = MSA_TABLE
+        # Per-instance so each invocation sees fresh rates; misses are cached too.
+        self._rate_cache: Dict[Tuple[str, str, str], float | None] = {}
 
-    @lru_cache(maxsize=256)
     def get_rate_for_labor_type(self, vendor: str, labor_type: str, location: str = "default") -> float | None:
-        normalized_vendor = (vendor or DEFAULT_VENDOR_NAME).strip().upper() or DEFAULT_VENDOR_NAME
+        normalized_vendor = _normalize_vendor(vendor)
         labor_code = str(labor_type or "RS").upper()
-        locations: List[str] = [location] if location and location != "default" else []
-        locations.append("default")
-
-        rate_keys: List[Dict[str, str]] = [
-            _rate_key(normalized_vendor, labor_code, loc) for loc in locations
-        ]
-        rate_keys.extend(
-            [
-                {
-                    "rate_id": f"{normalized_vendor}#{labor_code}_default",
-                    "effective_date": DEFAULT_EFFECTIVE_DATE,
-                },
-                {
-                    "rate_id": f"{normalized_vendor}#{labor_code}",
-                    "effective_date": DEFAULT_EFFECTIVE_DATE,
-                },
-            ]
-        )
+        cache_key = (normalized_vendor, labor_code, location)
+        if cache_key not in self._rate_cache:
+            self._rate_cache[cache_key] = self._lookup_rate(normalized_vendor, labor_code, location)
+        return self._rate_cache[cache_key]
+
+    def prefetch_rates(self, vendor: str, labor_types: Iterable[str]) -> None:
+        """Warm the cache for default-location rates with BatchGetItem.
+
+        Types left unresolved (missing, unprocessed or a failed batch) fall
+        back to the per-key lookups in get_rate_for_labor_type.
+        """
+        normalized_vendor = _normalize_vendor(vendor)
+        candidates: Dict[str, List[Dict[str, str]]] = {}
+        for labor_type in labor_types:
+            labor_code = str(labor_type or "RS").upper()
+            if (normalized_vendor, labor_code, "default") not in self._rate_cache:
+                candidates[labor_code] = _candidate_rate_keys(normalized_vendor, labor_code, "default")
+        if not candidates:
+            return
+
+        unique_keys = list({key["rate_id"]: key for keys in candidates.values() for key in keys}.values())
+        items: Dict[str, Dict[str, Any]] = {}
+        try:
+            table_name = self.table.name
+            batch_get_item = self.table.meta.client.batch_get_item
+            for start in range(0, len(unique_keys), BATCH_GET_MAX_KEYS):
+                request: Dict[str, Any] = {table_name: {"Keys": unique_keys[start : start + BATCH_GET_MAX_KEYS]}}
+                for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+                    if attempt:
+                        # Unprocessed keys mean the table is throttling; back off
+                        # exponentially with full jitter before retrying them.
+                        time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY_SECONDS * (2 ** attempt)))
+                    response = batch_get_item(RequestItems=request)
+                    for item in response.get("Responses", {}).get(table_name, []):
+                        items[item["rate_id"]] = item
+                    request = response.get("UnprocessedKeys") or {}
+                    if not request:
+                        break
+        except Exception as exc:
+            logger.warning("Batch MSA rate prefetch failed, using per-key lookups: %s", exc)
+            return
+
+        for labor_code, keys in candidates.items():
+            for key in keys:
+                item = items.get(key["rate_id"])
+                rate_value = _to_float(item["standard_rate"]) if item and "standard_rate" in item else None
+                if rate_value is not None:
+                    self._rate_cache[(normalized_vendor, labor_code, "default")] = rate_value
+                    break
+
+    def _lookup_rate(self, normalized_vendor: str, labor_code: str, location: str) -> float | None:
+        rate_keys = _candidate_rate_keys(normalized_vendor, labor_code, location)
 
         for key in rate_keys:
             try:
@@ -94,10 +157,13 @@ class InvoiceAuditor:
         discrepancies: List[Dict[str, Any]] = []
         savings_total = 0.0
         worker_hours: Dict[str, float] = {}
-        costs: List[float] = []
+        # Every row contributes a cost, so the array is filled in place.
+        costs = np.empty(len(labour_rows), dtype=float)
         seen_keys: set[Tuple[str, str, float, float]] = set()
 
-        for row in labour_rows:
+        self.msa_manager.prefetch_rates(vendor, {str(row.get("type") or "RS") for row in labour_rows})
+
+        for index, row in enumerate(labour_rows):
             name = str(row.get("name") or "Unknown").strip()
             worker_key = name.lower()
             labor_type = str(row.get("type") or "RS").upper()
@@ -112,7 +178,7 @@ class InvoiceAuditor:
             total = _to_float(row.get("total"))
             if total is None:
                 total = hours * rate
-            costs.append(total)
+            costs[index] = total
 
             worker_hours[worker_key] = worker_hours.get(worker_key, 0.0) + hours
 
@@ -171,21 +237,20 @@ class InvoiceAuditor:
                     }
                 )
 
-        if costs:
-            array_costs = np.array(costs, dtype=float)
-            std_dev = np.std(array_costs) or 1.0
-            z_scores = np.abs((array_costs - np.mean(array_costs)) / std_dev)
-            for row, z_score_value, total_cost in zip(labour_rows, z_scores, costs):
-                if z_score_value > 3.0:
-                    discrepancies.append(
-                        {
-                            "type": "cost_anomaly",
-                            "worker": str(row.get("name", "Unknown")),
-                            "labor_type": str(row.get("type", "RS")),
-                            "total": round(float(total_cost), 2),
-                            "z_score": round(float(z_score_value), 2),
-                        }
-                    )
+        if costs.size:
+            std_dev = np.std(costs) or 1.0
+            z_scores = np.abs((costs - np.mean(costs)) / std_dev)
+            for index in np.flatnonzero(z_scores > 3.0):
+                row = labour_rows[index]
+                discrepancies.append(
+                    {
+                        "type": "cost_anomaly",
+                        "worker": str(row.get("name", "Unknown")),
+                        "labor_type": str(row.get("type", "RS")),
+                        "total": round(float(costs[index]), 2),
+                        "z_score": round(float(z_scores[index]), 2),
+                    }
+                )
 
         return {
             "discrepancies": discrepancies,
@@ -248,7 +313,7 @@ def call_extraction_lambda(bucket: str | None, key: str | None) -> Dict[str, Any
             raw = body.read()
             if raw:
                 return json.loads(raw)
-    except Exception as exc:  # pragma: no cover - defensive logging only
+    except Exception as exc:
         logger.warning("Extraction invocation failed for %s/%s: %s", bucket, key, exc)
     return {}
 
@@ -288,8 +353,9 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
         if action != "audit":
             raise ValueError(f"Unsupported action for MVP: {action}")
 
-        bucket = event.get("bucket") or event.get("context", {}).get("file_info", {}).get("bucket")
-        key = event.get("key") or event.get("context", {}).get("file_info", {}).get("key")
+        file_info = (event.get("context") or {}).get("file_info") or {}
+        bucket = event.get("bucket") or file_info.get("bucket")
+        key = event.get("key") or file_info.get("key")
 
         extracted_data = event.get("extracted_data")
         if not extracted_data:
@@ -314,7 +380,7 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
         return {
             "status": "pending_approval",
             "vendor": vendor,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
             "audit_results": {
                 "summary": summary,
                 "discrepancies": discrepancies,
@@ -328,7 +394,7 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
             "status": "error",
             "error_type": "validation_error",
             "message": str(exc),
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
         }
     except Exception as exc:  # pragma: no cover - defensive
         logger.error("Unhandled error: %s", exc)
@@ -336,7 +402,7 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
             "status": "error",
             "error_type": "internal_error",
             "message": str(exc),
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
         }
     finally:
         duration = time.time() - start_time
@@ -7,12 +7,14 @@ import logging
 import os
 import re
 import time
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
 
 import boto3
-import pandas as pd
 from botocore.exceptions import ClientError
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
@@ -53,6 +55,14 @@ QUERY_ALIAS_MAPPING = {
 
 SERIALIZED_BLOCKS_MAX_CHARS = 200_000
 
+# Common OCR misreads of digits in numeric cells; spaces are dropped outright.
+_OCR_DIGIT_TRANS = str.maketrans(
+    {"o": "0", "O": "0", "l": "1", "I": "1", "S": "5", "s": "5", "B": "8", "C": "0", " ": None}
+)
+_NON_NUMERIC_RE = re.compile(r"[^0-9.\-]")
+# Substring match, like the keyword set it is built from ("ot" also hits "total").
+_LABOUR_KEYWORD_RE = re.compile("|".join(map(re.escape, sorted(LABOUR_KEYWORDS))), re.IGNORECASE)
+
 
 def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
     bucket, key = _object_location(event)
@@ -166,7 +176,7 @@ def _serialize_blocks(blocks: List[Dict[str, Any]]) -> str:
             for table in tables:
                 if table:
                     column_count = max(len(row) for row in table)
-                    headers = table[0] if table else []
+                    headers = table[0]
                     if not headers or any(header.strip() == "" for header in headers):
                         headers = [f"Column {idx}" for idx in range(1, column_count + 1)]
                         body_rows = table
@@ -444,7 +454,10 @@ def _labour_entries(tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
             continue
         if not _looks_like_labour(df.columns):
             continue
-        for _, row in df.iterrows():
+        # Plain dict records avoid building a pandas Series for every row. Only
+        # hours, rate and total are coerced in _table_to_df; the split hour
+        # columns still go through _to_float below.
+        for row in df.to_dict("records"):
             regular_hours = _to_float(row.get("reg_hours"))
             overtime_hours = _to_float(row.get("ot_hours"))
             record = {
@@ -471,6 +484,10 @@ def _labour_entries(tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
 
 
 def _table_to_df(rows: List[List[str]]) -> pd.DataFrame | None:
+    # pandas is only needed on the Textract table path, so keep it off the
+    # cold-start import of the handler.
+    import pandas as pd
+
     if len(rows) < 2:
         return None
     header = [_clean_header(cell) for cell in rows[0]]
@@ -478,6 +495,9 @@ def _table_to_df(rows: List[List[str]]) -> pd.DataFrame | None:
         return None
     df = pd.DataFrame(rows[1:], columns=header)
     df = _rename_columns(df)
+    # Textract often repeats blank header cells; those columns carry no field
+    # and duplicate names would be dropped (with a warning) by to_dict.
+    df = df.loc[:, (df.columns != "") & ~df.columns.duplicated()]
     for column in {"hours", "rate", "total"}:
         if column in df:
             df[column] = pd.to_numeric(df[column].str.replace(r"[^0-9.\-]", "", regex=True), errors="coerce")
@@ -487,10 +507,10 @@ def _table_to_df(rows: List[List[str]]) -> pd.DataFrame | None:
 def _rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     rename: Dict[str, str] = {}
     seen: set[str] = set()
+    # Headers arrive already lowercased by _clean_header in _table_to_df.
     for column in df.columns:
-        lowered = column.lower()
         for field, aliases in COLUMN_ALIASES.items():
-            if any(alias in lowered for alias in aliases) and field not in seen:
+            if any(alias in column for alias in aliases) and field not in seen:
                 rename[column] = field
                 seen.add(field)
                 break
@@ -498,8 +518,7 @@ def _rename_columns(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def _looks_like_labour(columns: Iterable[str]) -> bool:
-    joined = " ".join(columns).lower()
-    return any(keyword in joined for keyword in LABOUR_KEYWORDS)
+    return _LABOUR_KEYWORD_RE.search(" ".join(columns)) is not None
 
 
 def _cell_text(cell: Dict[str, Any], block_map: Dict[str, Dict[str, Any]]) -> str:
@@ -546,20 +565,7 @@ def _to_float(value: Any) -> float | None:
     cleaned = str(value).strip()
     if not cleaned:
         return None
-    replacements = {
-        "o": "0",
-        "O": "0",
-        "l": "1",
-        "I": "1",
-        "S": "5",
-        "s": "5",
-        "B": "8",
-        "C": "0",
-    }
-    for old, new in replacements.items():
-        cleaned = cleaned.replace(old, new)
-    cleaned = cleaned.replace(" ", "")
-    numeric = re.sub(r"[^0-9.\-]", "", cleaned)
+    numeric = _NON_NUMERIC_RE.sub("", cleaned.translate(_OCR_DIGIT_TRANS))
     if numeric in {"", "-", "."}:
         return None
     try:
@@ -4,7 +4,7 @@ import logging
 import os
 import time
 import urllib.parse
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any, List
 
 import boto3
@@ -97,7 +97,7 @@ class FileProcessor:
             'file_size': file_info['size'],
             'file_type': file_info['extension'],
             'content_type': file_info['content_type'],
-            'upload_timestamp': datetime.utcnow().isoformat(),
+            'upload_timestamp': datetime.now(timezone.utc).isoformat(),
             'etag': file_info['etag']
         }
         metadata['document_type'] = 'pdf'
@@ -118,7 +118,7 @@ class WorkflowOrchestrator:
         retry_delay = 2
         for attempt in range(max_retries):
             try:
-                execution_name = f"ingestion-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{input_data.get('file_info', {}).get('etag', 'unknown')[:8]}"
+                execution_name = f"ingestion-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{input_data.get('file_info', {}).get('etag', 'unknown')[:8]}"
                 response = self.stepfunctions_client.start_execution(
                     stateMachineArn=self.state_machine_arn,
                     name=execution_name,
@@ -207,7 +207,7 @@ def handle_s3_event(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'file_info': file_info,
                 'bucket': bucket,
                 'key': key,
-                'event_time': datetime.utcnow().isoformat(),
+                'event_time': datetime.now(timezone.utc).isoformat(),
                 'source': 's3_event',
                 'batch_mode': False,
                 'vendor': file_info.get('vendor') or DEFAULT_VENDOR_NAME,
@@ -35,12 +35,13 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
     discrepancies: List[Dict[str, Any]] = []
     savings_total = 0.0
     worker_hours: Dict[str, float] = {}
-    costs: List[float] = []
+    # Every row contributes a cost, so the array is filled in place.
+    costs = np.empty(len(labour_rows), dtype=float)
     seen_keys: set[Tuple[str, str, float, float]] = set()
 
     worker_display_names: Dict[str, str] = {}
 
-    for row in labour_rows:
+    for index, row in enumerate(labour_rows):
         labor_type = str(row.get("type", "RS")).upper()
         name = str(row.get("name", "Unknown")).strip() or "Unknown"
         reg_hours = _to_float(row.get("reg_hours")) or _to_float(row.get("hours_regular")) or 0.0
@@ -52,7 +53,7 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
         total = _to_float(row.get("total"))
         if total is None:
             total = (reg_hours + ot_hours) * rate
-        costs.append(total)
+        costs[index] = total
 
         worker_key = name.lower()
         worker_hours[worker_key] = worker_hours.get(worker_key, 0.0) + hours
@@ -122,21 +123,20 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
                 }
             )
 
-    if costs:
-        array_costs = np.array(costs, dtype=float)
-        std_dev = np.std(array_costs) or 1.0
-        z_scores = np.abs((array_costs - np.mean(array_costs)) / std_dev)
-        for row, z_score_value, total_cost in zip(labour_rows, z_scores, costs):
-            if z_score_value > 3.0:
-                discrepancies.append(
-                    {
-                        "type": "cost_anomaly",
-                        "worker": str(row.get("name", "Unknown")),
-                        "labor_type": str(row.get("type", "RS")),
-                        "total": round(float(total_cost), 2),
-                        "z_score": round(float(z_score_value), 2),
-                    }
-                )
+    if costs.size:
+        std_dev = np.std(costs) or 1.0
+        z_scores = np.abs((costs - np.mean(costs)) / std_dev)
+        for index in np.flatnonzero(z_scores > 3.0):
+            row = labour_rows[index]
+            discrepancies.append(
+                {
+                    "type": "cost_anomaly",
+                    "worker": str(row.get("name", "Unknown")),
+                    "labor_type": str(row.get("type", "RS")),
+                    "total": round(float(costs[index]), 2),
+                    "z_score": round(float(z_scores[index]), 2),
+                }
+            )
 
     return {
         "status": "ok",
@@ -10,6 +10,7 @@ from typing import Any, Dict, List
 
 import boto3
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, NamedStyle
 from openpyxl.utils import get_column_letter
 
@@ -26,57 +27,63 @@ HEADER_STYLE.alignment = Alignment(horizontal="center")
 CURRENCY_STYLE = NamedStyle(name="currency_style")
 CURRENCY_STYLE.number_format = "$#,##0.00"
 
+REPORT_HEADERS = (
+    "Worker",
+    "Labor Type",
+    "Issue Type",
+    "Hours",
+    "Actual Rate",
+    "MSA Rate",
+    "Variance",
+    "Savings / Details",
+)
+
 
 def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
-    flags = event.get("discrepancies") or event.get("reconciliation", {}).get("discrepancies") or []
+    reconciliation = event.get("reconciliation") or {}
+    flags = event.get("discrepancies") or reconciliation.get("discrepancies") or []
     report_id = event.get("report_id") or "audit-report"
     vendor = (event.get("vendor")
-              or event.get("metadata", {}).get("vendor")
-              or event.get("extracted_data", {}).get("vendor")
+              or (event.get("metadata") or {}).get("vendor")
+              or (event.get("extracted_data") or {}).get("vendor")
               or "UNKNOWN").upper()
 
-    total_savings = float(event.get("total_savings") or event.get("reconciliation", {}).get("total_savings") or 0.0)
-
-    workbook = openpyxl.Workbook()
-    _register_styles(workbook)
-
-    project_sheet = workbook.active
-    project_sheet.title = "Project Summary"
-    headers = [
-        "Worker",
-        "Labor Type",
-        "Issue Type",
-        "Hours",
-        "Actual Rate",
-        "MSA Rate",
-        "Variance",
-        "Savings / Details",
-    ]
-    project_sheet.append(headers)
-    _style_header_row(project_sheet[1])
+    total_savings = float(event.get("total_savings") or reconciliation.get("total_savings") or 0.0)
 
+    rows: List[List[Any]] = []
     savings_total = 0.0
     for item in flags:
         row, row_savings = _format_discrepancy_row(item)
-        project_sheet.append(row)
+        rows.append(row)
         savings_total += row_savings
 
-    if project_sheet.max_row == 1:
-        project_sheet.append(["No discrepancies detected", "", "", "", "", "", "", ""])
+    if not rows:
+        rows.append(["No discrepancies detected", "", "", "", "", "", "", ""])
 
-    totals_row_idx = project_sheet.max_row + 1
-    project_sheet.append(["", "", "Totals", "", "", "", "", savings_total])
-    totals_row = project_sheet[totals_row_idx]
-    totals_row[2].font = Font(bold=True)
-    totals_row[7].style = CURRENCY_STYLE
+    totals_row: List[Any] = ["", "", "Totals", "", "", "", "", savings_total]
 
-    _auto_size_columns(project_sheet)
+    # Write-only workbooks stream rows straight to the archive instead of
+    # holding a cell grid, so styles and column widths are fixed up front.
+    workbook = openpyxl.Workbook(write_only=True)
+    _register_styles(workbook)
+
+    project_sheet = workbook.create_sheet("Project Summary")
+    _size_columns(project_sheet, [REPORT_HEADERS, *rows, totals_row])
+    project_sheet.append([_styled_cell(project_sheet, header, style=HEADER_STYLE.name) for header in REPORT_HEADERS])
+    for row in rows:
+        project_sheet.append(row)
+    totals_row[2] = _styled_cell(project_sheet, totals_row[2], font=Font(bold=True))
+    totals_row[7] = _styled_cell(project_sheet, totals_row[7], style=CURRENCY_STYLE.name)
+    project_sheet.append(totals_row)
 
     summary_sheet = workbook.create_sheet("Summary")
-    summary_sheet.append(["Vendor", vendor])
-    summary_sheet.append(["Total Savings", total_savings])
-    summary_sheet["B2"].style = CURRENCY_STYLE
-    _style_summary_labels(summary_sheet["A1"], summary_sheet["A2"])
+    summary_sheet.append([_summary_label(summary_sheet, "Vendor"), vendor])
+    summary_sheet.append(
+        [
+            _summary_label(summary_sheet, "Total Savings"),
+            _styled_cell(summary_sheet, total_savings, style=CURRENCY_STYLE.name),
+        ]
+    )
 
     buffer = BytesIO()
     workbook.save(buffer)
@@ -136,25 +143,29 @@ def _register_styles(workbook: openpyxl.Workbook) -> None:
         workbook.add_named_style(CURRENCY_STYLE)
 
 
-def _style_header_row(row) -> None:
-    for cell in row:
-        cell.style = HEADER_STYLE
+def _styled_cell(sheet, value: Any, style: str | None = None, font: Font | None = None) -> WriteOnlyCell:
+    cell = WriteOnlyCell(sheet, value=value)
+    if style:
+        cell.style = style
+    if font:
+        cell.font = font
+    return cell
 
 
-def _style_summary_labels(*cells) -> None:
-    for cell in cells:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="left")
+def _summary_label(sheet, value: str) -> WriteOnlyCell:
+    cell = _styled_cell(sheet, value, font=Font(bold=True))
+    cell.alignment = Alignment(horizontal="left")
+    return cell
 
 
-def _auto_size_columns(sheet: openpyxl.worksheet.worksheet.Worksheet) -> None:
-    for column_idx, column in enumerate(sheet.columns, start=1):
-        max_length = 0
-        for cell in column:
-            if cell.value is not None:
-                max_length = max(max_length, len(str(cell.value)))
-        adjusted_width = max(max_length + 2, 12)
-        sheet.column_dimensions[get_column_letter(column_idx)].width = adjusted_width
+def _size_columns(sheet, rows: List[Any]) -> None:
+    widths: Dict[int, int] = {}
+    for row in rows:
+        for column_idx, value in enumerate(row, start=1):
+            length = len(str(value)) if value is not None else 0
+            widths[column_idx] = max(widths.get(column_idx, 0), length)
+    for column_idx, max_length in widths.items():
+        sheet.column_dimensions[get_column_letter(column_idx)].width = max(max_length + 2, 12)
 
 
 if __name__ == "__main__":
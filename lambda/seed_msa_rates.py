@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Dict, Iterable, List
 
@@ -92,6 +92,7 @@ def _determine_vendor_name(event: Dict[str, Any] | None) -> str:
 def _items_with_metadata(vendor_name: str, seed_items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     normalized_vendor = vendor_name.strip() or DEFAULT_VENDOR_NAME
     normalized_vendor = normalized_vendor.upper()
+    created_at = datetime.now(timezone.utc).isoformat()
     items: List[Dict[str, Any]] = []
     for seed_item in seed_items:
         base_item = dict(seed_item)
@@ -101,7 +102,7 @@ def _items_with_metadata(vendor_name: str, seed_items: Iterable[Dict[str, Any]])
             "rate_id": f"{normalized_vendor}#{seed_item['rate_id']}",
             "vendor": normalized_vendor,
             "effective_date": effective_date,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": created_at,
         }
         placeholder_value = base_item.get("placeholder_rate", base_item.get("standard_rate"))
         default_payload = {
@@ -109,7 +110,7 @@ def _items_with_metadata(vendor_name: str, seed_items: Iterable[Dict[str, Any]])
             "rate_id": f"{seed_item['rate_id']}_default",
             "vendor": normalized_vendor,
             "effective_date": effective_date,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": created_at,
             "standard_rate": placeholder_value,
         }
         items.append(vendor_payload)
@@ -119,7 +120,7 @@ def _items_with_metadata(vendor_name: str, seed_items: Iterable[Dict[str, Any]])
             "rate_id": "ratio_rules_su_rs",
             "vendor": normalized_vendor,
             "effective_date": DEFAULT_EFFECTIVE_DATE,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": created_at,
             "max_ratio": Decimal("6.0"),
         }
     )
@@ -1,6 +1,7 @@
 import importlib
 import json
-import os
+import math
+from io import BytesIO
 from types import SimpleNamespace
 from decimal import Decimal
 
@@ -8,6 +9,13 @@ import boto3
 import pytest
 from moto import mock_aws
 
+# Import once for the whole module. Its DynamoDB resource is built at import
+# time, so create it under mock_aws to pick up moto's credentials.
+with mock_aws():
+    agent_lambda = importlib.import_module("lambda.agent_lambda")
+
+_MODEL_RESPONSE_BODY = json.dumps({"content": [{"text": "report"}]}).encode()
+
 
 class DummyClient:
     def __init__(self, service_name: str):
@@ -26,7 +34,7 @@ class DummyClient:
 
     # Bedrock runtime fallback
     def invoke_model(self, *args, **kwargs):
-        return {"body": SimpleNamespace(read=lambda: json.dumps({"content": [{"text": "report"}]}).encode())}
+        return {"body": SimpleNamespace(read=lambda: _MODEL_RESPONSE_BODY)}
 
     # Lambda async invocation
     def invoke(self, *args, **kwargs):
@@ -64,8 +72,7 @@ def _patch_boto_clients(monkeypatch):
     monkeypatch.setattr(boto3, "client", fake_client)
 
 
-def _create_msa_table(region_name: str = "us-east-1"):
-    dynamodb = boto3.resource("dynamodb", region_name=region_name)
+def _create_msa_table(dynamodb):
     table = dynamodb.create_table(
         TableName="msa-rates",
         KeySchema=[
@@ -78,33 +85,50 @@ def _create_msa_table(region_name: str = "us-east-1"):
         ],
         BillingMode="PAY_PER_REQUEST",
     )
-    table.wait_until_exists()
-    table.put_item(
-        Item={
-            "labor_type": "RS",
-            "location": "default",
-            "standard_rate": Decimal("70.0"),
-        }
-    )
-    table.put_item(
-        Item={
-            "labor_type": "default",
-            "location": "overtime_rules",
-            "weekly_threshold": Decimal("40"),
-        }
-    )
-    return table
-
-
-@mock_aws
-def test_agent_fallback_response(monkeypatch):
+    with table.batch_writer() as batch:
+        batch.put_item(
+            Item={
+                "labor_type": "RS",
+                "location": "default",
+                "standard_rate": Decimal("70.0"),
+            }
+        )
+        batch.put_item(
+            Item={
+                "labor_type": "default",
+                "location": "overtime_rules",
+                "weekly_threshold": Decimal("40"),
+            }
+        )
+    # The create_table response cached item_count=0 on this handle; hand back
+    # a fresh one so attributes load lazily after the batch write.
+    return dynamodb.Table(table.name)
+
+
+@pytest.fixture(scope="module")
+def aws():
+    with mock_aws():
+        yield
+
+
+@pytest.fixture(scope="module")
+def ddb(aws):
+    return boto3.resource("dynamodb", region_name="us-east-1")
+
+
+@pytest.fixture(scope="module")
+def msa_table(ddb):
+    # Tests only read the seeded rates, so one table serves the whole module.
+    return _create_msa_table(ddb)
+
+
+@pytest.mark.slow
+def test_agent_fallback_response(monkeypatch, msa_table):
     monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
     monkeypatch.setenv("BEDROCK_AGENT_ID", "")
     _patch_boto_clients(monkeypatch)
-    _create_msa_table()
 
-    module = importlib.import_module("lambda.agent_lambda")
-    manager = module.BedrockAgentManager()
+    manager = agent_lambda.BedrockAgentManager()
 
     response = manager.invoke_agent("What is the MSA rate for RS labor?")
 
@@ -113,15 +137,13 @@ def test_agent_fallback_response(monkeypatch):
     assert response["session_id"] in manager._session_cache
 
 
-@mock_aws
-def test_audit_flow_returns_completed(monkeypatch):
+@pytest.mark.slow
+def test_audit_flow_returns_completed(monkeypatch, msa_table):
     monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
     monkeypatch.setenv("BEDROCK_AGENT_ID", "")
     monkeypatch.setenv("BUCKET_NAME", "audit-bucket")
     _patch_boto_clients(monkeypatch)
-    dynamo_table = _create_msa_table()
 
-    module = importlib.import_module("lambda.agent_lambda")
 
     def fake_call_extraction(bucket, key):
         return {
@@ -142,8 +164,8 @@ def test_audit_flow_returns_completed(monkeypatch):
             "status": "success",
         }
 
-    monkeypatch.setattr(module, "call_extraction_lambda", fake_call_extraction)
-    monkeypatch.setattr(module.BedrockAgentManager, "invoke_agent", staticmethod(fake_invoke_agent))
+    monkeypatch.setattr(agent_lambda, "call_extraction_lambda", fake_call_extraction)
+    monkeypatch.setattr(agent_lambda.BedrockAgentManager, "invoke_agent", staticmethod(fake_invoke_agent))
 
     event = {
         "action": "audit",
@@ -152,11 +174,105 @@ def test_audit_flow_returns_completed(monkeypatch):
         "context": {"file_info": {"bucket": "audit-bucket", "key": "invoice.pdf"}},
     }
 
-    result = module.lambda_handler(event, None)
+    result = agent_lambda.lambda_handler(event, None)
 
     assert result["status"] == "pending_approval"
     assert result["audit_results"]["summary"]["rate_variances"] == 1
     assert result["audit_results"]["discrepancies"][0]["worker"] == "Worker A"
 
     # Ensure the DynamoDB table was referenced
-    assert dynamo_table.item_count >= 2
+    assert msa_table.item_count >= 2
+
+
+def test_call_extraction_lambda_accepts_nan_from_blank_cells(monkeypatch):
+    # Blank numeric cells come back from the extraction lambda as NaN, which
+    # json.dumps writes as a bare token; the agent must still decode it.
+    body = json.dumps({"labor": [{"name": "Worker A", "hours": float("nan"), "total": float("nan")}]}).encode()
+    lambda_client = SimpleNamespace(invoke=lambda **_: {"Payload": BytesIO(body)})
+    monkeypatch.setattr(boto3, "client", lambda service_name, *args, **kwargs: lambda_client)
+
+    result = agent_lambda.call_extraction_lambda("audit-bucket", "invoice.pdf")
+
+    assert result["labor"][0]["name"] == "Worker A"
+    assert math.isnan(result["labor"][0]["hours"])
+
+
+def test_call_extraction_lambda_returns_empty_on_invoke_failure(monkeypatch):
+    def failing_invoke(**_kwargs):
+        raise RuntimeError("lambda unavailable")
+
+    monkeypatch.setattr(boto3, "client", lambda service_name, *args, **kwargs: SimpleNamespace(invoke=failing_invoke))
+
+    assert agent_lambda.call_extraction_lambda("audit-bucket", "invoice.pdf") == {}
+
+
+def test_msa_rate_lookups_are_cached_per_manager():
+    requested_keys = []
+
+    class CountingTable:
+        def get_item(self, Key):
+            requested_keys.append(Key)
+            return {"Item": {"standard_rate": Decimal("70.0")}}
+
+    manager = agent_lambda.MSARatesManager()
+    manager.table = CountingTable()
+
+    assert manager.get_rate_for_labor_type("SERVPRO", "RS") == 70.0
+    assert manager.get_rate_for_labor_type("servpro", "rs") == 70.0
+    assert len(requested_keys) == 1
+
+
+@pytest.mark.slow
+def test_prefetch_rates_batches_default_lookups(monkeypatch, ddb):
+    table = ddb.create_table(
+        TableName="vendor-msa-rates",
+        KeySchema=[
+            {"AttributeName": "rate_id", "KeyType": "HASH"},
+            {"AttributeName": "effective_date", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "rate_id", "AttributeType": "S"},
+            {"AttributeName": "effective_date", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.put_item(
+        Item={"rate_id": "SERVPRO#RS_default", "effective_date": agent_lambda.DEFAULT_EFFECTIVE_DATE, "standard_rate": Decimal("70.0")}
+    )
+
+    manager = agent_lambda.MSARatesManager()
+    manager.table = table
+    manager.prefetch_rates("servpro", ["rs"])
+
+    assert manager._rate_cache == {("SERVPRO", "RS", "default"): 70.0}
+
+    # A served-from-cache lookup must not fall back to per-key GetItem calls.
+    get_item_calls = []
+    monkeypatch.setattr(table, "get_item", lambda **kwargs: get_item_calls.append(kwargs))
+    assert manager.get_rate_for_labor_type("SERVPRO", "RS") == 70.0
+    assert get_item_calls == []
+
+
+def test_prefetch_rates_backs_off_before_retrying_unprocessed_keys(monkeypatch):
+    rate_key = {"rate_id": "SERVPRO#RS_default", "effective_date": agent_lambda.DEFAULT_EFFECTIVE_DATE}
+    responses = [
+        {"Responses": {"rates": []}, "UnprocessedKeys": {"rates": {"Keys": [rate_key]}}},
+        {"Responses": {"rates": [{**rate_key, "standard_rate": Decimal("70.0")}]}},
+    ]
+    requests = []
+
+    def batch_get_item(RequestItems):
+        requests.append(RequestItems)
+        return responses[len(requests) - 1]
+
+    delays = []
+    monkeypatch.setattr(agent_lambda.time, "sleep", delays.append)
+    monkeypatch.setattr(agent_lambda.random, "uniform", lambda low, high: high)
+
+    manager = agent_lambda.MSARatesManager()
+    manager.table = SimpleNamespace(name="rates", meta=SimpleNamespace(client=SimpleNamespace(batch_get_item=batch_get_item)))
+    manager.prefetch_rates("servpro", ["rs"])
+
+    assert requests[1] == {"rates": {"Keys": [rate_key]}}
+    assert delays == [agent_lambda.BATCH_GET_BASE_DELAY_SECONDS * 2]
+    assert manager._rate_cache == {("SERVPRO", "RS", "default"): 70.0}
@@ -1,18 +1,60 @@
 import importlib
 import json
-import os
-import sys
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timezone
 from typing import Dict, Tuple
 
 import pytest
 
+_INGESTION = importlib.import_module("lambda.ingestion_lambda")
+STATE_MACHINE_ARN = "arn:aws:states:us-east-1:123456789012:stateMachine:mock"
+
+
+def _s3_event(bucket, *keys):
+    return {"Records": [{"s3": {"bucket": {"name": bucket}, "object": {"key": key}}} for key in keys]}
+
+
+# Shared, read-only inputs: the handler and fakes never mutate them.
+_PDF_OBJECTS = {
+    ("labor-bucket", "invoice.pdf"): {
+        "size": 2048,
+        "etag": "labor",
+        "metadata": {"source": "unit-test"},
+        "last_modified": datetime(2024, 1, 1),
+    }
+}
+_PDF_EVENT = _s3_event("labor-bucket", "invoice.pdf")
+_XLSX_EVENT = _s3_event("labor-bucket", "invoice.xlsx")
+
+_MULTI_PDF_OBJECTS = {
+    ("labor", "one.pdf"): {"size": 1024, "etag": "one"},
+    ("labor", "two.pdf"): {"size": 4096, "etag": "two"},
+}
+_MULTI_PDF_EVENT = _s3_event("labor", "one.pdf", "two.pdf")
+
+_LABOR_ONLY_OBJECTS = {
+    ("labor", "labor_only.pdf"): {
+        "size": 5120,
+        "metadata": {"labor_only": "true", "project": "alpha"},
+        "etag": "labor-only",
+    }
+}
+_LABOR_ONLY_EVENT = _s3_event("labor", "labor_only.pdf")
+
+_OVERSIZED_OBJECTS = {
+    ("labor", "oversized.pdf"): {
+        "size": 6 * 1024 * 1024,
+        "etag": "oversized",
+    }
+}
+_OVERSIZED_EVENT = _s3_event("labor", "oversized.pdf")
+
 
 class FakeS3Client:
     def __init__(self, objects: Dict[Tuple[str, str], Dict[str, object]]):
         self.objects = objects
-        self.head_requests = []
-        self.tag_requests = []
+        self.head_requests = deque()
+        self.tag_requests = deque()
 
     def head_object(self, Bucket, Key):
         self.head_requests.append((Bucket, Key))
@@ -25,7 +67,7 @@ class FakeS3Client:
             "ContentType": obj.get("content_type", "application/pdf"),
             "Metadata": obj.get("metadata", {}),
             "ETag": obj.get("etag", "test-etag"),
-            "LastModified": obj.get("last_modified", datetime.utcnow()),
+            "LastModified": obj.get("last_modified", datetime.now(timezone.utc)),
         }
 
     def get_object_tagging(self, Bucket, Key):
@@ -35,7 +77,7 @@ class FakeS3Client:
 
 class FakeStepFunctionsClient:
     def __init__(self):
-        self.start_calls = []
+        self.start_calls = deque()
 
     def start_execution(self, stateMachineArn, name, input):
         payload = json.loads(input)
@@ -49,161 +91,81 @@ class FakeStepFunctionsClient:
         return {"executionArn": f"arn:aws:states:us-east-1:123456789012:execution/mock/{name}"}
 
 
+@pytest.fixture(scope="module")
+def ingestion_env():
+    # The module reads its configuration at import time, so patch the
+    # resolved attributes once for the whole module rather than per test.
+    patcher = pytest.MonkeyPatch()
+    patcher.setattr(_INGESTION, "STATE_MACHINE_ARN", STATE_MACHINE_ARN)
+    patcher.setattr(_INGESTION, "USE_SFN", True)
+    yield _INGESTION
+    patcher.undo()
+
+
 @pytest.fixture
-def load_ingestion(monkeypatch):
+def load_ingestion(monkeypatch, ingestion_env):
     def _loader(objects):
-        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
-        monkeypatch.setenv(
-            "STATE_MACHINE_ARN",
-            "arn:aws:states:us-east-1:123456789012:stateMachine:mock",
-        )
-        for module_name in [name for name in list(sys.modules) if name.startswith("lambda.ingestion_lambda")]:
-            sys.modules.pop(module_name, None)
-        module = importlib.import_module("lambda.ingestion_lambda")
+        module = ingestion_env
         fake_s3 = FakeS3Client(objects)
         fake_sf = FakeStepFunctionsClient()
-        module.s3_client = fake_s3
-        module.stepfunctions_client = fake_sf
+        monkeypatch.setattr(module, "s3_client", fake_s3)
+        monkeypatch.setattr(module, "stepfunctions_client", fake_sf)
         return module, fake_s3, fake_sf
 
     return _loader
 
 
-def test_pdf_event_starts_workflow(load_ingestion):
-    module, _, fake_sf = load_ingestion(
-        {
-            ("labor-bucket", "invoice.pdf"): {
-                "size": 2048,
-                "etag": "labor",
-                "metadata": {"source": "unit-test"},
-                "last_modified": datetime(2024, 1, 1),
-            }
-        }
-    )
-    event = {
-        "Records": [
-            {
-                "s3": {
-                    "bucket": {"name": "labor-bucket"},
-                    "object": {"key": "invoice.pdf"},
-                }
-            }
-        ]
-    }
+@pytest.mark.parametrize(
+    "objects,event,expected_status,expected_error,expected_file_info",
+    [
+        pytest.param(
+            _PDF_OBJECTS,
+            _PDF_EVENT,
+            200,
+            None,
+            {"extension": ".pdf", "is_supported": True},
+            id="pdf-starts-workflow",
+        ),
+        pytest.param({}, _XLSX_EVENT, 400, "Invalid file type", None, id="non-pdf-rejected"),
+        pytest.param(
+            _LABOR_ONLY_OBJECTS,
+            _LABOR_ONLY_EVENT,
+            200,
+            None,
+            {"metadata": {"labor_only": "true", "project": "alpha"}, "content_type": "application/pdf"},
+            id="labor-metadata",
+        ),
+        pytest.param(_OVERSIZED_OBJECTS, _OVERSIZED_EVENT, 400, "Invalid file type", None, id="oversized-rejected"),
+    ],
+)
+def test_single_file_event(load_ingestion, objects, event, expected_status, expected_error, expected_file_info):
+    module, _, fake_sf = load_ingestion(objects)
 
     response = module.lambda_handler(event, None)
 
-    assert response["statusCode"] == 200
+    assert response["statusCode"] == expected_status
+    if expected_error is not None:
+        assert response["error"] == expected_error
+        assert not fake_sf.start_calls
+        return
+
     results = response["body"]["results"]
     assert results[0]["status"] == "workflow_started"
     assert fake_sf.start_calls, "Expected workflow to start for PDF input"
 
-    start_payload = fake_sf.start_calls[0]["input"]
-    assert start_payload["file_info"]["extension"] == ".pdf"
-    assert start_payload["file_info"]["is_supported"] is True
-
-
-def test_non_pdf_event_rejected(load_ingestion):
-    module, _, fake_sf = load_ingestion({})
-    event = {
-        "Records": [
-            {
-                "s3": {
-                    "bucket": {"name": "labor-bucket"},
-                    "object": {"key": "invoice.xlsx"},
-                }
-            }
-        ]
-    }
-
-    response = module.lambda_handler(event, None)
-
-    assert response["statusCode"] == 400
-    assert response["error"] == "Invalid file type"
-    assert not fake_sf.start_calls
+    payload = fake_sf.start_calls[0]["input"]
+    assert payload["bucket"] == event["Records"][0]["s3"]["bucket"]["name"]
+    for field, value in expected_file_info.items():
+        assert payload["file_info"][field] == value
 
 
 def test_multiple_pdf_files_load_individual_workflows(load_ingestion):
-    module, fake_s3, fake_sf = load_ingestion(
-        {
-            ("labor", "one.pdf"): {"size": 1024, "etag": "one"},
-            ("labor", "two.pdf"): {"size": 4096, "etag": "two"},
-        }
-    )
-
-    event = {
-        "Records": [
-            {"s3": {"bucket": {"name": "labor"}, "object": {"key": "one.pdf"}}},
-            {"s3": {"bucket": {"name": "labor"}, "object": {"key": "two.pdf"}}},
-        ]
-    }
+    module, fake_s3, fake_sf = load_ingestion(_MULTI_PDF_OBJECTS)
 
-    response = module.lambda_handler(event, None)
+    response = module.lambda_handler(_MULTI_PDF_EVENT, None)
 
     assert response["statusCode"] == 200
     results = response["body"]["results"]
     assert len(results) == 2
-    assert fake_s3.head_requests == [("labor", "one.pdf"), ("labor", "two.pdf")]
+    assert list(fake_s3.head_requests) == [("labor", "one.pdf"), ("labor", "two.pdf")]
     assert len(fake_sf.start_calls) == 2
-
-
-def test_pdf_payload_contains_labor_metadata(load_ingestion):
-    module, _, fake_sf = load_ingestion(
-        {
-            ("labor", "labor_only.pdf"): {
-                "size": 5120,
-                "metadata": {"labor_only": "true", "project": "alpha"},
-                "etag": "labor-only",
-            }
-        }
-    )
-
-    response = module.lambda_handler(
-        {
-            "Records": [
-                {
-                    "s3": {
-                        "bucket": {"name": "labor"},
-                        "object": {"key": "labor_only.pdf"},
-                    }
-                }
-            ]
-        },
-        None,
-    )
-
-    assert response["statusCode"] == 200
-    payload = fake_sf.start_calls[0]["input"]
-    metadata = payload["file_info"]["metadata"]
-    assert metadata.get("labor_only") == "true"
-    assert payload["file_info"]["content_type"] == "application/pdf"
-    assert payload["bucket"] == "labor"
-
-
-def test_pdf_rejects_large_file(load_ingestion):
-    module, _, fake_sf = load_ingestion(
-        {
-            ("labor", "oversized.pdf"): {
-                "size": 6 * 1024 * 1024,
-                "etag": "oversized",
-            }
-        }
-    )
-
-    response = module.lambda_handler(
-        {
-            "Records": [
-                {
-                    "s3": {
-                        "bucket": {"name": "labor"},
-                        "object": {"key": "oversized.pdf"},
-                    }
-                }
-            ]
-        },
-        None,
-    )
-
-    assert response["statusCode"] == 400
-    assert response["error"] == "Invalid file type"
-    assert not fake_sf.start_calls
@@ -1,7 +1,4 @@
 import importlib
-import os
-import sys
-import time
 from decimal import Decimal
 
 import boto3
@@ -10,67 +7,65 @@ import pytest
 moto = pytest.importorskip("moto")
 mock_aws = moto.mock_aws
 
+pytestmark = pytest.mark.slow
 
-def _load_module():
-    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
-    os.environ.setdefault("MSA_RATES_TABLE", "msa-rates")
-    os.environ.setdefault("CREATE_MSA_TABLE_IF_MISSING", "true")
-    sys.modules.pop("lambda.seed_msa_rates", None)
-    return importlib.import_module("lambda.seed_msa_rates")
+seed_msa_rates = importlib.import_module("lambda.seed_msa_rates")
 
 
-def _setup(monkeypatch):
-    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
-    monkeypatch.setenv("MSA_RATES_TABLE", "msa-rates")
-    monkeypatch.setenv("CREATE_MSA_TABLE_IF_MISSING", "true")
-    monkeypatch.setattr(time, "sleep", lambda x: None)
+def _setup(monkeypatch, ddb):
+    # The module resolves its table and resource at import time; bind both to
+    # the active moto backend instead of re-importing it.
+    monkeypatch.setattr(seed_msa_rates, "DYNAMODB", ddb)
+    monkeypatch.setattr(seed_msa_rates, "TABLE_NAME", "msa-rates")
+    return seed_msa_rates
 
 
-def _ensure_table_exists():
-    ddb = boto3.resource("dynamodb", region_name="us-east-1")
+@pytest.fixture(scope="module", autouse=True)
+def _moto():
+    with mock_aws():
+        yield
+
+
+@pytest.fixture(scope="module")
+def ddb(_moto):
+    return boto3.resource("dynamodb", region_name="us-east-1")
+
+
+@pytest.fixture
+def msa_table(ddb):
+    """Reset the DynamoDB backend and recreate an empty msa-rates table."""
+    from moto.core import DEFAULT_ACCOUNT_ID
+    from moto.dynamodb.models import dynamodb_backends
+
+    dynamodb_backends[DEFAULT_ACCOUNT_ID]["us-east-1"].reset()
     client = ddb.meta.client
-    if "msa-rates" not in client.list_tables().get("TableNames", []):
-        client.create_table(
-            TableName="msa-rates",
-            KeySchema=[{"AttributeName": "rate_id", "KeyType": "HASH"}],
-            AttributeDefinitions=[{"AttributeName": "rate_id", "AttributeType": "S"}],
-            BillingMode="PAY_PER_REQUEST",
-        )
-        client.get_waiter("table_exists").wait(TableName="msa-rates")
-    return ddb
-
-
-@mock_aws()
-def test_table_create(monkeypatch):
-    _setup(monkeypatch)
-    ddb = _ensure_table_exists()
-    seed_module = _load_module()
+    client.create_table(
+        TableName="msa-rates",
+        KeySchema=[{"AttributeName": "rate_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "rate_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return ddb.Table("msa-rates")
+
+
+def test_table_create(monkeypatch, ddb, msa_table):
+    seed_module = _setup(monkeypatch, ddb)
     seed_module.lambda_handler({}, None)
-    tables = list(ddb.tables.all())
-    assert any(t.name == "msa-rates" for t in tables)
+    table_names = msa_table.meta.client.list_tables()["TableNames"]
+    assert "msa-rates" in table_names
 
 
-@mock_aws()
-def test_currency(monkeypatch):
-    _setup(monkeypatch)
-    ddb = _ensure_table_exists()
-    seed_module = _load_module()
+def test_currency(monkeypatch, ddb, msa_table):
+    seed_module = _setup(monkeypatch, ddb)
     seed_module.lambda_handler({}, None)
-    table = ddb.Table("msa-rates")
-    items = table.scan(ConsistentRead=True)["Items"]
-    items_by_id = {item["rate_id"]: item for item in items}
-    assert "RS_default" in items_by_id
-    assert items_by_id["RS_default"]["standard_rate"] == Decimal("70.00")
-
-
-@mock_aws()
-def test_ratios(monkeypatch):
-    _setup(monkeypatch)
-    ddb = _ensure_table_exists()
-    seed_module = _load_module()
+    item = msa_table.get_item(Key={"rate_id": "RS_default"}).get("Item")
+    assert item is not None
+    assert item["standard_rate"] == Decimal("70.00")
+
+
+def test_ratios(monkeypatch, ddb, msa_table):
+    seed_module = _setup(monkeypatch, ddb)
     seed_module.lambda_handler({}, None)
-    table = ddb.Table("msa-rates")
-    items = table.scan(ConsistentRead=True)["Items"]
-    items_by_id = {item["rate_id"]: item for item in items}
-    assert "ratio_rules_su_rs" in items_by_id
-    assert items_by_id["ratio_rules_su_rs"]["max_ratio"] == Decimal("6.0")
+    item = msa_table.get_item(Key={"rate_id": "ratio_rules_su_rs"}).get("Item")
+    assert item is not None
+    assert item["max_ratio"] == Decimal("6.0")
@@ -1,12 +1,17 @@
-"""Tests for minimal extraction lambda."""
+"""Tests for the extraction lambda handler and its Bedrock response handling.
+
+Handler tests run against moto-backed S3. The Bedrock parsing and merge tests
+need no AWS backend but stay here beside the shared Bedrock payload fakes;
+the remaining pure helpers are covered in test_extraction_unit.py.
+"""
 
 from __future__ import annotations
 
 import json
-from decimal import Decimal
 from importlib import import_module
 from io import BytesIO
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
 import boto3
 import pytest
@@ -15,22 +20,32 @@ from moto import mock_aws
 
 BUCKET = "input-bucket"
 
+extraction_lambda = import_module("lambda.extraction_lambda")
+
+
+@pytest.fixture(scope="module")
+def input_bucket():
+    """Moto bucket holding the sample invoice; handlers only read it."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        s3.put_object(Bucket=BUCKET, Key="invoice.pdf", Body=b"pdf")
+        # The module's own clients may predate mock_aws (and its credentials)
+        # if the unit tests imported it first, so bind ones created here.
+        patcher = pytest.MonkeyPatch()
+        patcher.setattr(extraction_lambda, "s3_client", s3)
+        patcher.setattr(extraction_lambda, "textract_client", boto3.client("textract", region_name="us-east-1"))
+        patcher.setattr(
+            extraction_lambda,
+            "bedrock_client",
+            boto3.client("bedrock-runtime", region_name=extraction_lambda.BEDROCK_REGION),
+        )
+        yield BUCKET
+        patcher.undo()
 
-@pytest.fixture(autouse=True)
-def _env(monkeypatch):
-    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
-
-
-def _load_extraction_module():
-    return import_module("lambda.extraction_lambda")
-
-
-@mock_aws
-def test_extraction_returns_labour_rows(monkeypatch):
-    s3 = boto3.client("s3", region_name="us-east-1")
-    s3.create_bucket(Bucket=BUCKET)
-    s3.put_object(Bucket=BUCKET, Key="invoice.pdf", Body=b"pdf")
 
+@pytest.mark.slow
+def test_extraction_returns_labour_rows(monkeypatch, input_bucket):
     fake_blocks = [
         {"BlockType": "TABLE", "Id": "1", "Relationships": [{"Type": "CHILD", "Ids": ["2", "3"]}]},
         {"Id": "2", "BlockType": "CELL", "RowIndex": 1, "ColumnIndex": 1, "Relationships": [{"Type": "CHILD", "Ids": ["4"]}]},
@@ -39,230 +54,95 @@ def test_extraction_returns_labour_rows(monkeypatch):
         {"Id": "5", "BlockType": "WORD", "Text": "Hours"},
     ]
 
-    with patch("lambda.extraction_lambda.textract_client", MagicMock(analyze_document=MagicMock(return_value={"Blocks": fake_blocks}))):
-        extraction_lambda = _load_extraction_module()
-        event = {"bucket": BUCKET, "key": "invoice.pdf"}
-        result = extraction_lambda.lambda_handler(event, None)
-        assert result["status"] == "ok"
-        assert result["bucket"] == BUCKET
-
+    fake_textract = SimpleNamespace(analyze_document=lambda **_: {"Blocks": fake_blocks})
+    monkeypatch.setattr(extraction_lambda, "textract_client", fake_textract)
+
+    event = {"bucket": BUCKET, "key": "invoice.pdf"}
+    result = extraction_lambda.lambda_handler(event, None)
+    assert result["status"] == "ok"
+    assert result["bucket"] == BUCKET
+
+
+def _textract_table_blocks(rows: list[list[str]]) -> list[dict]:
+    """Expand a grid of cell text into TABLE, CELL and WORD blocks."""
+    cells: list[dict] = []
+    words: list[dict] = []
+    for row_index, row in enumerate(rows, start=1):
+        for column_index, text in enumerate(row, start=1):
+            word_ids = []
+            for word_index, word in enumerate(text.split(), start=1):
+                word_id = f"word-{row_index}-{column_index}-{word_index}"
+                word_ids.append(word_id)
+                words.append({"BlockType": "WORD", "Id": word_id, "Text": word})
+            cells.append(
+                {
+                    "Id": f"cell-{row_index}-{column_index}",
+                    "BlockType": "CELL",
+                    "RowIndex": row_index,
+                    "ColumnIndex": column_index,
+                    "Relationships": [{"Type": "CHILD", "Ids": word_ids}],
+                }
+            )
+    table = {
+        "BlockType": "TABLE",
+        "Id": "table-1",
+        "Relationships": [{"Type": "CHILD", "Ids": [cell["Id"] for cell in cells]}],
+    }
+    return [table, *cells, *words]
 
-def test_extraction_missing_location():
-    extraction_lambda = _load_extraction_module()
 
-    with pytest.raises(ValueError):
-        extraction_lambda.lambda_handler({}, None)
+# Extraction only reads these blocks, so one shared copy serves every test.
+_FAKE_TEXTRACT_BLOCKS: list[dict] = [
+    *_textract_table_blocks(
+        [
+            ["Worker", "Type", "Reg", "OT", "Rate", "Total"],
+            ["Robbins, Dorian", "RS", "40", "15", "77", "4812.5"],
+        ]
+    ),
+    {"BlockType": "QUERY_RESULT", "Query": {"Alias": "VENDOR_NAME"}, "Text": "Fallback Vendor"},
+]
 
 
-def test_parse_query_results_extracts_vendor():
-    extraction_lambda = _load_extraction_module()
-    blocks = [
+# Bedrock's structured answer for the sample invoice. Tests serialise it into
+# fake responses and never mutate it, so one module-level copy is shared.
+_BEDROCK_PAYLOAD = {
+    "vendor": "SERVPRO",
+    "labor": [
         {
-            "BlockType": "QUERY_RESULT",
-            "Query": {"Alias": "VENDOR_NAME"},
-            "Text": "Servpro Commercial, LLC",
-        },
-        {
-            "BlockType": "QUERY_RESULT",
-            "Query": {"Alias": "INVOICE_TOTAL"},
-            "Text": "$4,321.45",
-        },
-    ]
-
-    metadata = extraction_lambda._parse_query_results(blocks)
-    assert metadata["vendor"] == "SERVPRO COMMERCIAL, LLC"
-    assert metadata["invoice_total"] == pytest.approx(4321.45)
+            "name": "Robbins, Dorian",
+            "type": "RS",
+            "reg_hours": 40.0,
+            "ot_hours": 15.0,
+            "rate": 77.0,
+            "total": 4812.5,
+        }
+    ],
+    "summaries": {
+        "total_regular_hours": 458.75,
+        "total_ot_hours": 661.0,
+        "total_labor_charges": 77150.25,
+        "by_type": {"RS": 7828.5},
+    },
+}
+# Serialised once; each call wraps it in a fresh BytesIO.
+_BEDROCK_BODY = json.dumps({"completion": json.dumps(_BEDROCK_PAYLOAD)}).encode()
 
 
-def test_to_float_handles_ocr_noise():
-    extraction_lambda = _load_extraction_module()
+def _fake_run_textract(_bucket, _key, _size_bytes):
+    return _FAKE_TEXTRACT_BLOCKS
 
-    assert extraction_lambda._to_float("5C") == pytest.approx(50.0)
-    assert extraction_lambda._to_float("ooc") == pytest.approx(0.0)
-    assert extraction_lambda._to_float(Decimal("12.5")) == pytest.approx(12.5)
 
+def _fake_invoke_model(**_kwargs):
+    return {"body": BytesIO(_BEDROCK_BODY)}
 
-def test_labour_entries_normalizes_regular_ot():
-    extraction_lambda = _load_extraction_module()
-    table = [
-        ["Worker", "Type", "Reg", "OT", "Rate", "Total"],
-        ["Robbins, Dorian", "RS", "32", "8", "77", "3080"],
-    ]
 
-    labour_rows = extraction_lambda._labour_entries([table])
-    assert len(labour_rows) == 1
-    record = labour_rows[0]
-    assert record["hours"] == pytest.approx(40.0)
-    assert record["hours_regular"] == pytest.approx(32.0)
-    assert record["hours_ot"] == pytest.approx(8.0)
-    assert record["rate"] == pytest.approx(77.0)
+@pytest.mark.slow
+def test_bedrock_chain_prefers_bedrock(monkeypatch, input_bucket):
+    monkeypatch.setattr(extraction_lambda, "_run_textract", _fake_run_textract)
+    monkeypatch.setattr(extraction_lambda.bedrock_client, "invoke_model", _fake_invoke_model)
 
-
-def _fake_textract_blocks() -> list[dict]:
-    return [
-        {
-            "BlockType": "TABLE",
-            "Id": "table-1",
-            "Relationships": [
-                {
-                    "Type": "CHILD",
-                    "Ids": [
-                        "cell-1",
-                        "cell-2",
-                        "cell-3",
-                        "cell-4",
-                        "cell-5",
-                        "cell-6",
-                        "cell-7",
-                        "cell-8",
-                        "cell-9",
-                        "cell-10",
-                        "cell-11",
-                        "cell-12",
-                    ],
-                }
-            ],
-        },
-        {
-            "Id": "cell-1",
-            "BlockType": "CELL",
-            "RowIndex": 1,
-            "ColumnIndex": 1,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-worker"]}],
-        },
-        {
-            "Id": "cell-2",
-            "BlockType": "CELL",
-            "RowIndex": 1,
-            "ColumnIndex": 2,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-type"]}],
-        },
-        {
-            "Id": "cell-3",
-            "BlockType": "CELL",
-            "RowIndex": 1,
-            "ColumnIndex": 3,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-reg"]}],
-        },
-        {
-            "Id": "cell-4",
-            "BlockType": "CELL",
-            "RowIndex": 1,
-            "ColumnIndex": 4,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-ot"]}],
-        },
-        {
-            "Id": "cell-5",
-            "BlockType": "CELL",
-            "RowIndex": 1,
-            "ColumnIndex": 5,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-rate"]}],
-        },
-        {
-            "Id": "cell-6",
-            "BlockType": "CELL",
-            "RowIndex": 1,
-            "ColumnIndex": 6,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-total"]}],
-        },
-        {
-            "Id": "cell-7",
-            "BlockType": "CELL",
-            "RowIndex": 2,
-            "ColumnIndex": 1,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-name-1", "word-name-2"]}],
-        },
-        {
-            "Id": "cell-8",
-            "BlockType": "CELL",
-            "RowIndex": 2,
-            "ColumnIndex": 2,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-type-value"]}],
-        },
-        {
-            "Id": "cell-9",
-            "BlockType": "CELL",
-            "RowIndex": 2,
-            "ColumnIndex": 3,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-reg-value"]}],
-        },
-        {
-            "Id": "cell-10",
-            "BlockType": "CELL",
-            "RowIndex": 2,
-            "ColumnIndex": 4,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-ot-value"]}],
-        },
-        {
-            "Id": "cell-11",
-            "BlockType": "CELL",
-            "RowIndex": 2,
-            "ColumnIndex": 5,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-rate-value"]}],
-        },
-        {
-            "Id": "cell-12",
-            "BlockType": "CELL",
-            "RowIndex": 2,
-            "ColumnIndex": 6,
-            "Relationships": [{"Type": "CHILD", "Ids": ["word-total-value"]}],
-        },
-        {"BlockType": "WORD", "Id": "word-worker", "Text": "Worker"},
-        {"BlockType": "WORD", "Id": "word-type", "Text": "Type"},
-        {"BlockType": "WORD", "Id": "word-reg", "Text": "Reg"},
-        {"BlockType": "WORD", "Id": "word-ot", "Text": "OT"},
-        {"BlockType": "WORD", "Id": "word-rate", "Text": "Rate"},
-        {"BlockType": "WORD", "Id": "word-total", "Text": "Total"},
-        {"BlockType": "WORD", "Id": "word-name-1", "Text": "Robbins,"},
-        {"BlockType": "WORD", "Id": "word-name-2", "Text": "Dorian"},
-        {"BlockType": "WORD", "Id": "word-type-value", "Text": "RS"},
-        {"BlockType": "WORD", "Id": "word-reg-value", "Text": "40"},
-        {"BlockType": "WORD", "Id": "word-ot-value", "Text": "15"},
-        {"BlockType": "WORD", "Id": "word-rate-value", "Text": "77"},
-        {"BlockType": "WORD", "Id": "word-total-value", "Text": "4812.5"},
-        {
-            "BlockType": "QUERY_RESULT",
-            "Query": {"Alias": "VENDOR_NAME"},
-            "Text": "Fallback Vendor",
-        },
-    ]
-
-
-@mock_aws
-def test_bedrock_chain_prefers_bedrock(monkeypatch):
-    s3 = boto3.client("s3", region_name="us-east-1")
-    s3.create_bucket(Bucket=BUCKET)
-    s3.put_object(Bucket=BUCKET, Key="invoice.pdf", Body=b"pdf")
-
-    bedrock_payload = {
-        "vendor": "SERVPRO",
-        "labor": [
-            {
-                "name": "Robbins, Dorian",
-                "type": "RS",
-                "reg_hours": 40.0,
-                "ot_hours": 15.0,
-                "rate": 77.0,
-                "total": 4812.5,
-            }
-        ],
-        "summaries": {
-            "total_regular_hours": 458.75,
-            "total_ot_hours": 661.0,
-            "total_labor_charges": 77150.25,
-            "by_type": {"RS": 7828.5},
-        },
-    }
-
-    fake_response_body = json.dumps({"completion": json.dumps(bedrock_payload)}).encode()
-
-    with patch("lambda.extraction_lambda._run_textract", return_value=_fake_textract_blocks()), patch(
-        "lambda.extraction_lambda.bedrock_client.invoke_model",
-        return_value={"body": BytesIO(fake_response_body)},
-    ):
-        extraction_lambda = _load_extraction_module()
-        event = {"bucket": BUCKET, "key": "invoice.pdf"}
-        result = extraction_lambda.lambda_handler(event, None)
+    event = {"bucket": BUCKET, "key": "invoice.pdf"}
+    result = extraction_lambda.lambda_handler(event, None)
 
     assert result["vendor"] == "SERVPRO"
     assert len(result["labor"]) >= 1
@@ -270,21 +150,16 @@ def test_bedrock_chain_prefers_bedrock(monkeypatch):
     assert result["summaries"]["total_labor_charges"] == pytest.approx(77150.25)
 
 
-@mock_aws
-def test_bedrock_failure_falls_back_to_textract(monkeypatch):
-    s3 = boto3.client("s3", region_name="us-east-1")
-    s3.create_bucket(Bucket=BUCKET)
-    s3.put_object(Bucket=BUCKET, Key="invoice.pdf", Body=b"pdf")
+@pytest.mark.slow
+def test_bedrock_failure_falls_back_to_textract(monkeypatch, input_bucket):
+    def denied_invoke_model(**_kwargs):
+        raise ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "InvokeModel")
 
-    error = ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "InvokeModel")
+    monkeypatch.setattr(extraction_lambda, "_run_textract", _fake_run_textract)
+    monkeypatch.setattr(extraction_lambda.bedrock_client, "invoke_model", denied_invoke_model)
 
-    with patch("lambda.extraction_lambda._run_textract", return_value=_fake_textract_blocks()), patch(
-        "lambda.extraction_lambda.bedrock_client.invoke_model",
-        side_effect=error,
-    ):
-        extraction_lambda = _load_extraction_module()
-        event = {"bucket": BUCKET, "key": "invoice.pdf"}
-        result = extraction_lambda.lambda_handler(event, None)
+    event = {"bucket": BUCKET, "key": "invoice.pdf"}
+    result = extraction_lambda.lambda_handler(event, None)
 
     assert result["vendor"] == "FALLBACK VENDOR"
     assert len(result["labor"]) == 1
@@ -293,43 +168,10 @@ def test_bedrock_failure_falls_back_to_textract(monkeypatch):
     assert result["summaries"] == {}
 
 
-def test_serialize_blocks_collects_lines():
-    extraction_lambda = _load_extraction_module()
-    blocks = [
-        {"BlockType": "PAGE", "Id": "page-1"},
-        {"BlockType": "LINE", "Text": "SERVPRO Commercial, LLC", "Page": 1},
-        {"BlockType": "WORD", "Text": "Invoice", "Page": 1},
-        {"BlockType": "LINE", "Text": "Total $160,356.28", "Page": 1},
-        {"BlockType": "LINE", "Text": "Robbins, Dorian RS 40 15 77 4812.5", "Page": 2},
-    ]
-
-    serialized = extraction_lambda._serialize_blocks(blocks)
-    assert "Page 1:" in serialized
-    assert "SERVPRO Commercial, LLC" in serialized
-    assert "Total $160,356.28" in serialized
-    assert "Page 2:" in serialized
-
-
 def test_invoke_bedrock_for_extraction_parses_completion(monkeypatch):
-    extraction_lambda = _load_extraction_module()
-
-    payload = {
-        "completion": json.dumps(
-            {
-                "vendor": "SERVPRO",
-                "labor": [{"name": "Robbins, Dorian", "type": "RS", "reg_hours": 40, "ot_hours": 15, "rate": 77, "total": 4812.5}],
-                "summaries": {
-                    "total_regular_hours": 458.75,
-                    "total_ot_hours": 661.0,
-                    "total_labor_charges": 77150.25,
-                    "by_type": {"RS": 7828.5},
-                },
-            }
-        )
-    }
+    monkeypatch.setattr(extraction_lambda.bedrock_client, "invoke_model", _fake_invoke_model)
 
-    with patch("lambda.extraction_lambda.bedrock_client.invoke_model", return_value={"body": BytesIO(json.dumps(payload).encode("utf-8"))}):
-        result = extraction_lambda._invoke_bedrock_for_extraction("sample text")
+    result = extraction_lambda._invoke_bedrock_for_extraction("sample text")
 
     assert result["vendor"] == "SERVPRO"
     assert result["labor"][0]["total"] == pytest.approx(4812.5)
@@ -337,8 +179,6 @@ def test_invoke_bedrock_for_extraction_parses_completion(monkeypatch):
 
 
 def test_merge_extractions_prefers_bedrock():
-    extraction_lambda = _load_extraction_module()
-
     textract_labor = [{"name": "Fallback Worker", "type": "RS", "hours": 10, "rate": 20, "total": 200}]
     bedrock_labor = [
         {
@@ -351,16 +191,7 @@ def test_merge_extractions_prefers_bedrock():
         }
         for idx in range(44)
     ]
-    bedrock_result = {
-        "vendor": "SERVPRO",
-        "labor": bedrock_labor,
-        "summaries": {
-            "total_regular_hours": 458.75,
-            "total_ot_hours": 661.0,
-            "total_labor_charges": 77150.25,
-            "by_type": {"RS": 7828.5},
-        },
-    }
+    bedrock_result = {**_BEDROCK_PAYLOAD, "labor": bedrock_labor}
 
     merged = extraction_lambda._merge_extractions(textract_labor, bedrock_result)
     assert merged["vendor"] == "SERVPRO"
@@ -368,30 +199,16 @@ def test_merge_extractions_prefers_bedrock():
     assert merged["summaries"]["total_ot_hours"] == pytest.approx(661.0)
 
 
-def test_merge_extractions_fallback_to_textract_when_bedrock_empty():
-    extraction_lambda = _load_extraction_module()
+@pytest.mark.slow
+def test_lambda_handler_skips_bedrock_when_text_too_large(monkeypatch, input_bucket):
+    oversized_text = "A" * (extraction_lambda.SERIALIZED_BLOCKS_MAX_CHARS + 1)
+    invoke_mock = MagicMock()
+    monkeypatch.setattr(extraction_lambda, "_run_textract", _fake_run_textract)
+    monkeypatch.setattr(extraction_lambda, "_serialize_blocks", lambda _blocks: oversized_text)
+    monkeypatch.setattr(extraction_lambda, "_invoke_bedrock_for_extraction", invoke_mock)
 
-    textract_labor = [{"name": "Fallback Worker", "type": "RS", "hours": 10, "rate": 20, "total": 200}]
-    merged = extraction_lambda._merge_extractions(textract_labor, {})
-    assert merged["labor"] == textract_labor
-    assert merged["vendor"] is None
-    assert merged["summaries"] == {}
-
-
-@mock_aws
-def test_lambda_handler_skips_bedrock_when_text_too_large(monkeypatch):
-    extraction_lambda = _load_extraction_module()
-
-    s3 = boto3.client("s3", region_name="us-east-1")
-    s3.create_bucket(Bucket=BUCKET)
-    s3.put_object(Bucket=BUCKET, Key="invoice.pdf", Body=b"pdf")
-
-    with patch("lambda.extraction_lambda._run_textract", return_value=_fake_textract_blocks()), patch(
-        "lambda.extraction_lambda._serialize_blocks",
-        return_value="A" * (extraction_lambda.SERIALIZED_BLOCKS_MAX_CHARS + 1),
-    ), patch("lambda.extraction_lambda._invoke_bedrock_for_extraction") as invoke_mock:
-        event = {"bucket": BUCKET, "key": "invoice.pdf"}
-        result = extraction_lambda.lambda_handler(event, None)
+    event = {"bucket": BUCKET, "key": "invoice.pdf"}
+    result = extraction_lambda.lambda_handler(event, None)
 
     invoke_mock.assert_not_called()
     assert result["vendor"] == "FALLBACK VENDOR"
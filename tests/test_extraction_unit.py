@@ -0,0 +1,123 @@
+"""Unit tests for the extraction lambda's pure parsing and fallback-merge helpers.
+
+Nothing here talks to AWS, so the module stays free of boto3 and moto
+imports. Handler tests and the tests built on the shared Bedrock payload
+live in test_extraction.py.
+"""
+
+from __future__ import annotations
+
+import warnings
+from decimal import Decimal
+from importlib import import_module
+from unittest.mock import MagicMock
+
+import pytest
+
+extraction_lambda = import_module("lambda.extraction_lambda")
+
+
+def test_extraction_missing_location():
+    with pytest.raises(ValueError):
+        extraction_lambda.lambda_handler({}, None)
+
+
+def test_parse_query_results_extracts_vendor():
+    blocks = [
+        {
+            "BlockType": "QUERY_RESULT",
+            "Query": {"Alias": "VENDOR_NAME"},
+            "Text": "Servpro Commercial, LLC",
+        },
+        {
+            "BlockType": "QUERY_RESULT",
+            "Query": {"Alias": "INVOICE_TOTAL"},
+            "Text": "$4,321.45",
+        },
+    ]
+
+    metadata = extraction_lambda._parse_query_results(blocks)
+    assert metadata["vendor"] == "SERVPRO COMMERCIAL, LLC"
+    assert metadata["invoice_total"] == pytest.approx(4321.45)
+
+
+def test_to_float_handles_ocr_noise():
+    assert extraction_lambda._to_float("5C") == pytest.approx(50.0)
+    assert extraction_lambda._to_float("ooc") == pytest.approx(0.0)
+    assert extraction_lambda._to_float(Decimal("12.5")) == pytest.approx(12.5)
+
+
+def test_labour_entries_normalizes_regular_ot():
+    table = [
+        ["Worker", "Type", "Reg", "OT", "Rate", "Total"],
+        ["Robbins, Dorian", "RS", "32", "8", "77", "3080"],
+    ]
+
+    labour_rows = extraction_lambda._labour_entries([table])
+    assert len(labour_rows) == 1
+    record = labour_rows[0]
+    assert record["hours"] == pytest.approx(40.0)
+    assert record["hours_regular"] == pytest.approx(32.0)
+    assert record["hours_ot"] == pytest.approx(8.0)
+    assert record["rate"] == pytest.approx(77.0)
+
+
+def test_labour_entries_ignores_blank_header_columns():
+    table = [
+        ["Worker", "", "Type", "", "Hours", "Rate"],
+        ["Robbins, Dorian", "x", "RS", "y", "40", "77"],
+    ]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        labour_rows = extraction_lambda._labour_entries([table])
+
+    assert labour_rows == [
+        {"name": "Robbins, Dorian", "type": "RS", "hours": 40.0, "rate": 77.0, "total": 3080.0}
+    ]
+
+
+def test_serialize_blocks_collects_lines():
+    blocks = [
+        {"BlockType": "PAGE", "Id": "page-1"},
+        {"BlockType": "LINE", "Text": "SERVPRO Commercial, LLC", "Page": 1},
+        {"BlockType": "WORD", "Text": "Invoice", "Page": 1},
+        {"BlockType": "LINE", "Text": "Total $160,356.28", "Page": 1},
+        {"BlockType": "LINE", "Text": "Robbins, Dorian RS 40 15 77 4812.5", "Page": 2},
+    ]
+
+    serialized = extraction_lambda._serialize_blocks(blocks)
+    assert "Page 1:" in serialized
+    assert "SERVPRO Commercial, LLC" in serialized
+    assert "Total $160,356.28" in serialized
+    assert "Page 2:" in serialized
+
+
+def test_textract_timeout(monkeypatch):
+    dummy = MagicMock()
+    dummy.get_document_analysis.return_value = {"JobStatus": "IN_PROGRESS"}
+    monkeypatch.setattr(extraction_lambda, "textract_client", dummy)
+
+    # Advance the clock by a fixed step per call so the deadline trips after
+    # two polls, without ever sleeping for real.
+    now = [0]
+
+    def fake_time():
+        now[0] += 60
+        return now[0]
+
+    monkeypatch.setattr(extraction_lambda.time, "time", fake_time)
+    monkeypatch.setattr(extraction_lambda.time, "sleep", lambda _seconds: None)
+
+    with pytest.raises(TimeoutError):
+        extraction_lambda._poll_textract("job-1", timeout_seconds=150)
+
+    assert dummy.get_document_analysis.call_count == 2
+
+
+def test_merge_extractions_fallback_to_textract_when_bedrock_empty():
+    textract_labor = [{"name": "Fallback Worker", "type": "RS", "hours": 10, "rate": 20, "total": 200}]
+    merged = extraction_lambda._merge_extractions(textract_labor, {})
+    assert merged["labor"] == textract_labor
+    assert merged["vendor"] is None
+    assert merged["summaries"] == {}
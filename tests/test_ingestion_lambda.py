@@ -3,49 +3,64 @@
 from __future__ import annotations
 
 import importlib
-import json
+from datetime import datetime
 from io import BytesIO
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
 import boto3
 import pytest
-import openpyxl
 from moto import mock_aws
 
 INGESTION_BUCKET = "invoice-ingestion"
 STATE_MACHINE_ARN = "arn:aws:states:us-east-1:123:stateMachine:invoice"
 
 
-def _load_ingestion_module(monkeypatch, use_sfn="true"):
-    monkeypatch.setenv("INGESTION_BUCKET", INGESTION_BUCKET)
-    monkeypatch.setenv("STATE_MACHINE_ARN", STATE_MACHINE_ARN)
-    monkeypatch.setenv("USE_SFN", use_sfn)
-    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
-    monkeypatch.setenv("DEFAULT_VENDOR_NAME", "SERVPRO")
-
-    module = importlib.import_module("lambda.ingestion_lambda")
-    return importlib.reload(module)
+_INGESTION = importlib.import_module("lambda.ingestion_lambda")
 
 
-@mock_aws
-def test_handle_s3_event_starts_workflow_with_vendor(monkeypatch):
-    s3_client = boto3.client("s3", region_name="us-east-1")
-    s3_client.create_bucket(Bucket=INGESTION_BUCKET)
-    s3_client.put_object(
-        Bucket=INGESTION_BUCKET,
-        Key="uploads/sample.pdf",
-        Body=b"data",
-        Metadata={"vendor": "Servpro"},
+def _load_ingestion_module(monkeypatch, use_sfn="true"):
+    # Configuration is resolved at import time, so patch the module
+    # attributes instead of reloading it for every test.
+    monkeypatch.setattr(_INGESTION, "STATE_MACHINE_ARN", STATE_MACHINE_ARN)
+    monkeypatch.setattr(_INGESTION, "USE_SFN", use_sfn == "true")
+    monkeypatch.setattr(_INGESTION, "DEFAULT_VENDOR_NAME", "SERVPRO")
+    return _INGESTION
+
+
+# FileProcessor only reads these responses and no test asserts on the S3
+# calls, so plain namespaces stand in for the client instead of mocks.
+_HEAD_OBJECT_RESPONSE = {
+    "ContentLength": 4,
+    "ContentType": "application/pdf",
+    "Metadata": {},
+    "ETag": '"test-etag"',
+    "LastModified": datetime(2024, 1, 1),
+}
+_TAGGING_RESPONSE = {"TagSet": []}
+_FAKE_S3 = SimpleNamespace(
+    head_object=lambda **_: _HEAD_OBJECT_RESPONSE,
+    get_object_tagging=lambda **_: _TAGGING_RESPONSE,
+)
+
+
+def _fake_s3_client(metadata=None):
+    """In-memory stand-in for the S3 calls FileProcessor makes."""
+    if not metadata:
+        return _FAKE_S3
+    head_response = {**_HEAD_OBJECT_RESPONSE, "Metadata": metadata}
+    return SimpleNamespace(
+        head_object=lambda **_: head_response,
+        get_object_tagging=_FAKE_S3.get_object_tagging,
     )
 
+
+def test_handle_s3_event_starts_workflow_with_vendor(monkeypatch):
     ingestion_lambda = _load_ingestion_module(monkeypatch, use_sfn="true")
+    monkeypatch.setattr(ingestion_lambda, "s3_client", _fake_s3_client({"vendor": "Servpro"}))
 
     start_mock = MagicMock(return_value="arn:aws:states:execution")
-    monkeypatch.setattr(
-        ingestion_lambda.WorkflowOrchestrator,
-        "start_workflow",
-        MagicMock(side_effect=start_mock),
-    )
+    monkeypatch.setattr(ingestion_lambda.WorkflowOrchestrator, "start_workflow", start_mock)
 
     event = {
         "Records": [
@@ -66,13 +81,9 @@ def test_handle_s3_event_starts_workflow_with_vendor(monkeypatch):
     assert workflow_payload["file_info"]["vendor"] == "SERVPRO"
 
 
-@mock_aws
 def test_handle_s3_event_fallback_includes_vendor(monkeypatch):
-    s3_client = boto3.client("s3", region_name="us-east-1")
-    s3_client.create_bucket(Bucket=INGESTION_BUCKET)
-    s3_client.put_object(Bucket=INGESTION_BUCKET, Key="uploads/sample.pdf", Body=b"data")
-
     ingestion_lambda = _load_ingestion_module(monkeypatch, use_sfn="false")
+    monkeypatch.setattr(ingestion_lambda, "s3_client", _fake_s3_client())
 
     fallback_mock = MagicMock(return_value={"status": "ok"})
     monkeypatch.setattr(ingestion_lambda, "_fallback_direct_processing", fallback_mock)
@@ -95,13 +106,9 @@ def test_handle_s3_event_fallback_includes_vendor(monkeypatch):
     assert kwargs[2]["vendor"] == "SERVPRO"
 
 
-@mock_aws
 def test_fallback_pipeline_returns_report_details(monkeypatch):
-    s3_client = boto3.client("s3", region_name="us-east-1")
-    s3_client.create_bucket(Bucket=INGESTION_BUCKET)
-    s3_client.put_object(Bucket=INGESTION_BUCKET, Key="uploads/sample.pdf", Body=b"data")
-
     ingestion_lambda = _load_ingestion_module(monkeypatch, use_sfn="false")
+    monkeypatch.setattr(ingestion_lambda, "s3_client", _fake_s3_client())
 
     def _fake_invoke(function_name, payload):
         if function_name == ingestion_lambda.EXTRACTION_LAMBDA_NAME:
@@ -134,10 +141,10 @@ def test_fallback_pipeline_returns_report_details(monkeypatch):
     assert details["reconciliation"]["discrepancies"]
 
 
+@pytest.mark.slow
 @mock_aws
 def test_fallback_pipeline_generates_excel_with_reconciliation(monkeypatch):
     reports_bucket = "reports-bucket"
-    monkeypatch.setenv("REPORTS_BUCKET_NAME", reports_bucket)
     s3_client = boto3.client("s3", region_name="us-east-1")
     s3_client.create_bucket(Bucket=INGESTION_BUCKET)
     s3_client.create_bucket(Bucket=reports_bucket)
@@ -150,6 +157,7 @@ def test_fallback_pipeline_generates_excel_with_reconciliation(monkeypatch):
     )
 
     ingestion_lambda = _load_ingestion_module(monkeypatch, use_sfn="false")
+    monkeypatch.setattr(ingestion_lambda, "s3_client", s3_client)
 
     extraction_payload = {
         "status": "ok",
@@ -209,7 +217,10 @@ def test_fallback_pipeline_generates_excel_with_reconciliation(monkeypatch):
         "total_savings": 11568.00,
     }
 
-    report_module = importlib.reload(importlib.import_module("lambda.report_lambda"))
+    # Not hoisted to module level: the report lambda pulls in openpyxl.
+    report_module = importlib.import_module("lambda.report_lambda")
+    monkeypatch.setattr(report_module, "REPORTS_BUCKET", reports_bucket)
+    monkeypatch.setattr(report_module, "S3", s3_client)
 
     def _invoke(function_name, payload):
         if function_name == ingestion_lambda.EXTRACTION_LAMBDA_NAME:
@@ -249,13 +260,16 @@ def test_fallback_pipeline_generates_excel_with_reconciliation(monkeypatch):
     assert len(details["reconciliation"]["discrepancies"]) == 2
     assert details["report"]["key"] == "reports/test-invoice.xlsx"
 
+    # Only this test reads a workbook; keep openpyxl off the module import path.
+    import openpyxl
+
     report_obj = s3_client.get_object(Bucket=reports_bucket, Key="reports/test-invoice.xlsx")
-    workbook = openpyxl.load_workbook(BytesIO(report_obj["Body"].read()))
+    workbook = openpyxl.load_workbook(BytesIO(report_obj["Body"].read()), read_only=True, data_only=True)
     summary_sheet = workbook["Summary"]
     assert summary_sheet["B1"].value == "SERVPRO"
     assert summary_sheet["B2"].value == pytest.approx(11568.0)
 
     project_sheet = workbook["Project Summary"]
-    data_rows = list(project_sheet.iter_rows(min_row=2, values_only=True))
-    assert any(row[0] == "Robbins, Dorian" and row[2] == "rate_variance" for row in data_rows)
-    assert any(row[2] == "overtime" for row in data_rows)
+    flagged = {(row[0], row[2]) for row in project_sheet.iter_rows(min_row=2, values_only=True)}
+    assert ("Robbins, Dorian", "rate_variance") in flagged
+    assert "overtime" in {issue for _, issue in flagged}
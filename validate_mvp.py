@@ -83,6 +83,8 @@ class ValidationContext:
 
 
 class LocalLambdaClient:
+    __slots__ = ("_dispatch_table",)
+
     def __init__(self, dispatch_table: Dict[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]]):
         self._dispatch_table = dispatch_table
 
@@ -107,6 +109,8 @@ class LocalLambdaClient:
 
 
 class MockTextractClient:
+    __slots__ = ("_labor_rows", "_invoice_metadata", "_blocks")
+
     def __init__(self, labor_rows: List[Dict[str, Any]], invoice_metadata: Dict[str, Any]):
         self._labor_rows = labor_rows
         self._invoice_metadata = invoice_metadata
@@ -211,6 +215,8 @@ class MockTextractClient:
 
 
 class MockBedrockClient:
+    __slots__ = ("_labor_rows", "_invoice_metadata", "should_fail", "raw_text")
+
     def __init__(self, labor_rows: List[Dict[str, Any]], invoice_metadata: Dict[str, Any]):
         self._labor_rows = labor_rows
         self._invoice_metadata = invoice_metadata
@@ -232,6 +238,8 @@ class MockBedrockClient:
 
 
 class LocalStepFunctionsStub:
+    __slots__ = ("_execution_outputs", "_sequence")
+
     def __init__(self, execution_outputs: Dict[str, Dict[str, Any]]):
         self._execution_outputs = execution_outputs
         self._sequence = itertools.count(1)
@@ -281,24 +289,29 @@ def format_bedrock_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def summarize_labor(labor_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
-    total_regular = round(sum(float(row.get("reg_hours") or 0.0) for row in labor_rows), 2)
-    total_ot = round(sum(float(row.get("ot_hours") or 0.0) for row in labor_rows), 2)
-    total_labor = round(sum((row.get("total") or calculate_line_total(row)) for row in labor_rows), 2)
+    total_regular = 0.0
+    total_ot = 0.0
+    total_labor = 0.0
     by_type: Dict[str, Dict[str, float]] = {}
     for row in labor_rows:
-        labor_type = row["type"]
-        entry = by_type.setdefault(labor_type, {"regular_hours": 0.0, "ot_hours": 0.0, "total": 0.0})
-        entry["regular_hours"] += float(row.get("reg_hours") or 0.0)
-        entry["ot_hours"] += float(row.get("ot_hours") or 0.0)
-        entry["total"] += float(row.get("total") or calculate_line_total(row))
+        regular_hours = float(row.get("reg_hours") or 0.0)
+        ot_hours = float(row.get("ot_hours") or 0.0)
+        line_total = row.get("total") or calculate_line_total(row)
+        total_regular += regular_hours
+        total_ot += ot_hours
+        total_labor += line_total
+        entry = by_type.setdefault(row["type"], {"regular_hours": 0.0, "ot_hours": 0.0, "total": 0.0})
+        entry["regular_hours"] += regular_hours
+        entry["ot_hours"] += ot_hours
+        entry["total"] += float(line_total)
     for entry in by_type.values():
         entry["regular_hours"] = round(entry["regular_hours"], 2)
         entry["ot_hours"] = round(entry["ot_hours"], 2)
         entry["total"] = round(entry["total"], 2)
     return {
-        "total_regular_hours": total_regular,
-        "total_ot_hours": total_ot,
-        "total_labor_charges": total_labor,
+        "total_regular_hours": round(total_regular, 2),
+        "total_ot_hours": round(total_ot, 2),
+        "total_labor_charges": round(total_labor, 2),
         "by_type": by_type,
     }
 